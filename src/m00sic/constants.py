@@ -168,6 +168,13 @@ TONIC_NOTE_FOR_KEY = {
     "ASm": None,
 }
 
+# Index of the tonic within NOTES_FOR_KEY, for keys whose tonic is defined.
+TONIC_IDX_FOR_KEY = {
+    key: NOTES_FOR_KEY[key].index(tonic)
+    for key, tonic in TONIC_NOTE_FOR_KEY.items()
+    if tonic is not None
+}
+
 # add more chords later
 STEPS_FOR_CHORD = {"major_triad": [0, 4, 7]}
 
@@ -14,9 +14,9 @@ from __future__ import annotations
 
 import abc
 import dataclasses
-import re
+import functools
 from enum import Enum, auto
-from typing import List
+from typing import List, Tuple
 
 from note_seq.protobuf import music_pb2
 
@@ -87,29 +87,38 @@ def _to_midi_num(symbol_name: str, octave: int):
 
 
 def _get_trailing_number(s: str):
-    m = re.search(r"\d+$", s)
-    return m.group() if m else None
+    prefix = s.rstrip("0123456789")
+    return s[len(prefix) :] or None
 
 
-@dataclasses.dataclass
 class PitchClass:
-    """A musical pitch class, e.g. 'G#' or 'B'."""
+    """A musical pitch class, e.g. 'G#' or 'B'.
+
+    There is exactly one instance per pitch class name, so PitchClass('C#') always
+    returns the same object and equality is identity.
+    """
 
-    name: str
-    index: int = dataclasses.field(init=False)
+    __slots__ = ("name", "index")
 
-    def __post_init__(self):
-        assert self.name in VALID_PITCH_CLASSES
-        self.index = _PITCH_CLASS_TO_RANK[self.name]
+    def __new__(cls, name: str) -> PitchClass:
+        pitch_class = _PITCH_CLASS_CANONICAL.get(name)
+        if pitch_class is None:
+            raise ValueError(f"Invalid pitch class: {name}.")
+        return pitch_class
+
+    @classmethod
+    def _make(cls, name: str, index: int) -> PitchClass:
+        pitch_class = object.__new__(cls)
+        pitch_class.name = name
+        pitch_class.index = index
+        return pitch_class
 
     def __add__(self, other: object) -> PitchClass:
         if not isinstance(other, int):
             raise TypeError(
                 f"Can only add integers to PitchClass object, not type {type(other)}."
             )
-        new_index = (self.index + other) % NOTES_PER_OCTAVE
-        new_name = PITCH_CLASSES[new_index][0]
-        return PitchClass(new_name)
+        return _PITCH_CLASS_ADD_TABLE[self.index][other % NOTES_PER_OCTAVE]
 
     def __sub__(self, other: object) -> PitchClass:
         if not isinstance(other, int):
@@ -119,8 +128,36 @@ class PitchClass:
             )
         return self.__add__(-other)
 
+    def __reduce__(self):
+        return (PitchClass, (self.name,))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name='{self.name}', index={self.index})"
+
+
+_PITCH_CLASS_CANONICAL = {
+    name: PitchClass._make(name, rank) for name, rank in _PITCH_CLASS_TO_RANK.items()
+}
+# _PITCH_CLASS_ADD_TABLE[rank][offset] is the result of adding offset to a pitch class
+# with the given rank.
+_PITCH_CLASS_ADD_TABLE = [
+    [
+        _PITCH_CLASS_CANONICAL[PITCH_CLASSES[(rank + offset) % NOTES_PER_OCTAVE][0]]
+        for offset in range(NOTES_PER_OCTAVE)
+    ]
+    for rank in range(NOTES_PER_OCTAVE)
+]
+
 
 class Note:
+    """A note with a name and an octave, e.g. 'C#4'.
+
+    Notes are immutable, since the same instances are shared through lookup tables
+    and caches.
+    """
+
+    __slots__ = ("name", "pitch_class", "octave", "midi_num")
+
     def __init__(self, name: str):
         """
         Args:
@@ -134,19 +171,30 @@ class Note:
         assert LOWEST_PIANO_OCTAVE <= octave <= HIGHEST_PIANO_OCTAVE
 
         # Check if note name is valid.
-        pitch_class = name[:-octave_nchar]
-        assert pitch_class in VALID_PITCH_CLASSES
+        pitch_class_name = name[:-octave_nchar]
+        pitch_class = _PITCH_CLASS_CANONICAL.get(pitch_class_name)
+        if pitch_class is None:
+            raise ValueError(f"Invalid note name: {name}.")
 
-        self.name = name
-        self.pitch_class = PitchClass(pitch_class)
-        self.octave = octave
-        self.midi_num = _to_midi_num(pitch_class, octave)
+        midi_num = _C0_MIDI_NUM + NOTES_PER_OCTAVE * octave + pitch_class.index
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "pitch_class", pitch_class)
+        object.__setattr__(self, "octave", octave)
+        object.__setattr__(self, "midi_num", midi_num)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"Cannot assign to '{name}': Note objects are immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Cannot delete '{name}': Note objects are immutable.")
+
+    def __reduce__(self):
+        return (Note, (self.name,))
 
     @classmethod
     def from_midi_num(cls, midi_num: int) -> Note:
         assert LOWEST_PIANO_MIDI_NUM <= midi_num <= HIGHEST_PIANO_MIDI_NUM
-        name = _to_note_name(midi_num)
-        return cls(name)
+        return _MIDI_TO_NOTE[midi_num]
 
     def __add__(self, other: object) -> Note:
         if not isinstance(other, int):
@@ -158,7 +206,7 @@ class Note:
             raise ValueError(
                 f"Sum is out of MIDI range: {new_midi_num} not in [0, 127]."
             )
-        return Note.from_midi_num(new_midi_num)
+        return _MIDI_TO_NOTE[new_midi_num]
 
     def __sub__(self, other: object) -> Note:
         if not isinstance(other, int):
@@ -170,17 +218,31 @@ class Note:
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Note):
             return False
-        return (
-            self.name == other.name
-            and self.pitch_class == other.pitch_class
-            and self.octave == other.octave
-            and self.midi_num == other.midi_num
-        )
+        # The pitch class and octave are derived from the name, so they don't need to
+        # be compared. The name is still needed to tell apart e.g. 'A#4' and 'Bb4'.
+        return self.midi_num == other.midi_num and self.name == other.name
+
+    def __hash__(self) -> int:
+        return self.midi_num
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}('{self.name}')"
 
 
+# Lookup table from MIDI number to Note, built once at import time. Entries outside
+# the piano range are None.
+_MIDI_TO_NOTE = [None] * 128
+for _midi_num in range(LOWEST_PIANO_MIDI_NUM, HIGHEST_PIANO_MIDI_NUM + 1):
+    _MIDI_TO_NOTE[_midi_num] = Note(_to_note_name(_midi_num))
+del _midi_num
+
+
+@functools.lru_cache(maxsize=256)
+def _make_note(name: str) -> Note:
+    """Cached Note constructor. There are fewer than 256 valid note names."""
+    return Note(name)
+
+
 @dataclasses.dataclass
 class Chord:
 
@@ -191,44 +253,48 @@ class Chord:
 
 # TODO Fix pitch classes in __repr__. The same letter shouldn't appear more than once.
 class Key(abc.ABC):
+
+    # Subclasses must set this to the intervals of the key's scale.
+    intervals: Tuple[int, ...] = ()
+
     def __init__(self, name):
-        assert name in VALID_PITCH_CLASSES
+        if not self.intervals:
+            raise TypeError(f"{self.__class__.__name__} must define intervals.")
+        # PitchClass validates the name.
+        tonic = PitchClass(name)
         self.name = name
-
-    @property
-    @abc.abstractmethod
-    def intervals(self):
-        ...
+        # The intervals are fixed per class and the name never changes, so the pitch
+        # classes only need to be computed once.
+        intervals = self.intervals
+        self._pitch_classes = tuple(tonic + i for i in intervals)
+        self._n_intervals = len(intervals)
 
     @property
     def pitch_classes(self):
-        return [PitchClass(self.name) + i for i in self.intervals]
+        return self._pitch_classes
 
     def _get_interval(self, degree):
-        offset = 0
-        if degree >= 0:
-            while degree >= len(self.intervals):
-                offset += NOTES_PER_OCTAVE
-                degree -= len(self.intervals)
-        else:
-            while degree < 0:
-                offset -= NOTES_PER_OCTAVE
-                degree += len(self.intervals)
-        return self.intervals[degree] + offset
+        # divmod floors towards -inf, so negative degrees land in lower octaves.
+        octaves, index = divmod(degree, self._n_intervals)
+        return self.intervals[index] + octaves * NOTES_PER_OCTAVE
 
     def get_note(self, degree, octave=4) -> Note:
-        scale_starting_note = Note(f"{self.name}{octave}")
+        scale_starting_note = _make_note(f"{self.name}{octave}")
         return scale_starting_note + self._get_interval(degree)
 
     def get_chord(self, positions, degree=0, octave=4, inversion=0) -> Chord:
         notes = [
             self.get_note(degree + position, octave=octave) for position in positions
         ]
-        for _ in range(abs(inversion)):
-            if inversion < 0:
-                notes = notes[:-1] + [notes[-1] - NOTES_PER_OCTAVE]
-            else:
-                notes = notes[1:] + [notes[0] + NOTES_PER_OCTAVE]
+        if inversion > 0:
+            # Every full cycle through the chord raises all notes by an octave.
+            octaves, num_rotated = divmod(inversion, len(notes))
+            offset = octaves * NOTES_PER_OCTAVE
+            notes = [note + offset for note in notes[num_rotated:]] + [
+                note + (offset + NOTES_PER_OCTAVE) for note in notes[:num_rotated]
+            ]
+        elif inversion < 0:
+            notes = notes[:-1] + [notes[-1] + inversion * NOTES_PER_OCTAVE]
         return Chord(notes)
 
     def get_triad(self, degree, octave=4, inversion=0) -> Chord:
@@ -271,20 +337,12 @@ class Key(abc.ABC):
 
 class MajorKey(Key):
 
-    _intervals = [0, 2, 4, 5, 7, 9, 11]
-
-    @property
-    def intervals(self):
-        return self._intervals
+    intervals = (0, 2, 4, 5, 7, 9, 11)
 
 
 class MinorKey(Key):
 
-    _intervals = [0, 2, 3, 5, 7, 8, 10]
-
-    @property
-    def intervals(self):
-        return self._intervals
+    intervals = (0, 2, 3, 5, 7, 8, 10)
 
 
 if __name__ == "__main__":
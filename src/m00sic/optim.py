@@ -4,12 +4,47 @@ A module for optimization algorithms.
 """
 
 import random
-from typing import List
+from typing import Callable, List
+import numpy as np
 from note_seq.protobuf import music_pb2
 from . import util
 from . import constants
 
 
+NUM_MIDI_PITCHES = 128
+
+# Lookup tables for _score_notes.
+# _IN_KEY_MASK[key][p] is True if pitch p is in the key.
+# _ALL_OCTAVES_MASK[p, q] is True if q is in util.all_octaves(p). Like util.ALL_OCTAVES,
+# it has extra rows so that p can be shifted up by an interval.
+_IN_KEY_MASK = {}
+for _key, _notes in constants.NOTES_FOR_KEY.items():
+    _IN_KEY_MASK[_key] = np.zeros(NUM_MIDI_PITCHES, dtype=bool)
+    _IN_KEY_MASK[_key][_notes] = True
+_ALL_OCTAVES_MASK = np.zeros((len(util.ALL_OCTAVES), NUM_MIDI_PITCHES), dtype=bool)
+for _pitch, _octaves in enumerate(util.ALL_OCTAVES):
+    _ALL_OCTAVES_MASK[_pitch, _octaves] = True
+del _key, _notes, _pitch, _octaves
+
+
+def _get_in_chords_mask(chord_progression) -> np.ndarray:
+    in_chords_mask = np.zeros(NUM_MIDI_PITCHES, dtype=bool)
+    in_chords_mask[[item for sublist in chord_progression for item in sublist]] = True
+    return in_chords_mask
+
+
+# Rewards for the interval from the previous note to the new note, in any octave, as
+# (interval in semitones, reward) pairs.
+_INTERVAL_REWARDS = (
+    ### Consonant ###
+    (0, constants.CONSONANT_INTERVAL_REWARD),  # Perfect unison
+    (5, constants.CONSONANT_INTERVAL_REWARD),  # perfect fourth
+    (7, constants.SUPER_CONSONANT_INTERVAL_REWARD),  # perfect fifth
+    ### Dissonant ###
+    (1, constants.DISSONANT_INTERVAL_REWARD),  # Minor second
+)
+
+
 # think about input note_sequence
 def calculate_score_of_new_note(key, chord_progression, previous_notes, new_note):
     score = 0
@@ -25,20 +60,11 @@ def calculate_score_of_new_note(key, chord_progression, previous_notes, new_note
     if generated_note in [item for sublist in chord_progression for item in sublist]:
         score += constants.NOTE_IN_CHORDS_REWARD
 
-    ### Consonant ###
-    # Perfect unison
-    if generated_note in util.all_octaves(previous_notes[-1]):
-        score += constants.CONSONANT_INTERVAL_REWARD
-    # perfect fourth
-    if generated_note in util.all_octaves(previous_notes[-1] + 5):
-        score += constants.CONSONANT_INTERVAL_REWARD
-    # perfect fifth
-    if generated_note in util.all_octaves(previous_notes[-1] + 7):
-        score += constants.SUPER_CONSONANT_INTERVAL_REWARD
-    ### Dissonant ###
-    # Minor second
-    if generated_note in util.all_octaves(previous_notes[-1] + 1):
-        score += constants.DISSONANT_INTERVAL_REWARD
+    previous_note = previous_notes[-1]
+
+    for interval, reward in _INTERVAL_REWARDS:
+        if (util.all_octaves_mask(previous_note + interval) >> generated_note) & 1:
+            score += reward
 
     # centricity
     score += previous_notes.count(generated_note) * constants.CENTRICITY_FACTOR
@@ -46,28 +72,70 @@ def calculate_score_of_new_note(key, chord_progression, previous_notes, new_note
     return score
 
 
-def value_fn(key, chord_progression, note_sequence: music_pb2.NoteSequence) -> float:
+def _score_notes(
+    previous_pitches, new_pitches, num_previous, in_key_mask, in_chords_mask
+) -> np.ndarray:
     """
-    A scalar-valued function that assigns a score to every note sequence.
-
+    Vectorized version of calculate_score_of_new_note, used by value_fn and
+    local_search. Scores playing new_pitches right after previous_pitches,
+    element-wise, where num_previous is how often each new pitch occurred earlier in
+    the sequence. The arguments are broadcast, so this can score every note of a
+    sequence at once, or several candidate notes after the same previous note.
     """
-    # for all sub sequences starting from first 2 notes, call calculate_score_of_generated_note and sum up scores
-    # can't find class for NoteSequence from Magenta (IDE?)
+    # valid note for key
+    scores = np.where(
+        in_key_mask[new_pitches],
+        constants.NOTE_IN_KEY_REWARD,
+        -constants.NOTE_IN_KEY_REWARD,
+    )
 
-    score = 0
+    # note in chord
+    scores += in_chords_mask[new_pitches] * constants.NOTE_IN_CHORDS_REWARD
 
-    pitches = util.extract_pitches(note_sequence)
+    for interval, reward in _INTERVAL_REWARDS:
+        scores += _ALL_OCTAVES_MASK[previous_pitches + interval, new_pitches] * reward
 
-    for end, pitch in enumerate(pitches[1:], 1):
+    # centricity
+    scores += num_previous * constants.CENTRICITY_FACTOR
 
-        score += calculate_score_of_new_note(
-            key, chord_progression, pitches[:end], pitch
-        )
+    return scores
 
-    return score
 
+def value_fn(key, chord_progression, note_sequence: music_pb2.NoteSequence) -> float:
+    """
+    A scalar-valued function that assigns a score to every note sequence.
 
-def local_search(value_fn, include_chords=False) -> music_pb2.NoteSequence:
+    """
+    # Equivalent to summing calculate_score_of_new_note over all prefixes of the
+    # sequence, but scores every note at once.
+    pitches = np.asarray(util.extract_pitches(note_sequence), dtype=np.intp)
+    if len(pitches) < 2:
+        return 0
+    previous_pitches, new_pitches = pitches[:-1], pitches[1:]
+
+    # centricity: number of times each note occurred earlier in the sequence. A stable
+    # sort keeps equal pitches in sequence order, so each note's position within its
+    # group of equal pitches is the number of earlier occurrences.
+    order = np.argsort(pitches, kind="stable")
+    sorted_pitches = pitches[order]
+    num_previous = np.empty_like(pitches)
+    num_previous[order] = np.arange(len(pitches)) - np.searchsorted(
+        sorted_pitches, sorted_pitches
+    )
+
+    scores = _score_notes(
+        previous_pitches,
+        new_pitches,
+        num_previous[1:],
+        _IN_KEY_MASK[key],
+        _get_in_chords_mask(chord_progression),
+    )
+    return scores.sum().item()
+
+
+def local_search(
+    value_fn: Callable, include_chords: bool = False
+) -> music_pb2.NoteSequence:
     """
     An optimization procedure that tries to find a note sequence with a high value,
     by greedily adding notes that result in the largest value.
@@ -104,18 +172,42 @@ def local_search(value_fn, include_chords=False) -> music_pb2.NoteSequence:
                 pitch=pitch, start_time=0.0, end_time=1.0, velocity=80
             )
 
+    candidate_notes = constants.NOTES_FOR_KEY[key]
+
+    # The default scoring function has a vectorized implementation that scores all
+    # candidates in one call.
+    use_vectorized_value_fn = value_fn is calculate_score_of_new_note
+    if use_vectorized_value_fn:
+        candidate_notes_arr = np.asarray(candidate_notes, dtype=np.intp)
+        in_key_mask = _IN_KEY_MASK[key]
+        in_chords_mask = _get_in_chords_mask(chord_progression)
+        # Kept up to date as notes are added, so that scoring doesn't need to rescan
+        # the whole sequence.
+        note_counts = np.bincount(
+            util.extract_pitches(best_note_seq), minlength=NUM_MIDI_PITCHES
+        )
+
     for i in range(1, desired_length):
 
+        # for each note, calculate its score.
+        if use_vectorized_value_fn:
+            scores = _score_notes(
+                best_note_seq.notes[-1].pitch,
+                candidate_notes_arr,
+                note_counts[candidate_notes_arr],
+                in_key_mask,
+                in_chords_mask,
+            ).tolist()
+        else:
+            previous_notes = util.extract_pitches(best_note_seq)
+            scores = [
+                value_fn(key, chord_progression, previous_notes, new_note)
+                for new_note in candidate_notes
+            ]
+
         # dict of score : list of notes
         new_note_scores = {}
-
-        for new_note in constants.NOTES_FOR_KEY[key]:
-
-            # for each note, calculate its score.
-            score = value_fn(
-                key, chord_progression, util.extract_pitches(best_note_seq), new_note
-            )
-
+        for new_note, score in zip(candidate_notes, scores):
             new_note_scores.setdefault(score, []).append(new_note)
 
         # If there is a tie for highest score, randomly pick from the tied notes
@@ -132,6 +224,11 @@ def local_search(value_fn, include_chords=False) -> music_pb2.NoteSequence:
                     pitch=pitch, start_time=i * 1.0, end_time=i * 1.0 + 1.0, velocity=80
                 )
 
+        if use_vectorized_value_fn:
+            note_counts[selected_note] += 1
+            if include_chords:
+                np.add.at(note_counts, list(chord), 1)
+
     return best_note_seq
 
 
@@ -2,8 +2,10 @@
 A module for utility functions.
 """
 
+import functools
 import random
-from typing import List
+from typing import List, Tuple
+import numpy as np
 from . import constants
 
 
@@ -14,6 +16,7 @@ def get_random_note_from_key(key):
     return random.choice(constants.NOTES_FOR_KEY[key])
 
 
+@functools.lru_cache(maxsize=256)
 def get_starting_note(key: str, offset: int) -> int:
     """
     Find the tonic note for the specified key, add the offset,
@@ -26,8 +29,7 @@ def get_starting_note(key: str, offset: int) -> int:
         offset in OFFSET_TO_INT
     ), f"Invalid offset: {offset}. Must be one of {OFFSET_TO_INT.keys()}."
     notes = constants.NOTES_FOR_KEY[key]
-    tonic = constants.TONIC_NOTE_FOR_KEY[key]
-    tonic_idx = notes.index(tonic)
+    tonic_idx = constants.TONIC_IDX_FOR_KEY[key]
     offset_int = OFFSET_TO_INT[offset]
     return notes[tonic_idx + offset_int]
 
@@ -36,31 +38,63 @@ def extract_pitches(note_sequence):
     return [note.pitch for note in note_sequence.notes]
 
 
+def _check_chord_args(key: str, starting_note: int, chord: str):
+    assert key in constants.NOTES_FOR_KEY, f"Invalid key: {key}."
+    assert (
+        starting_note in constants.NOTES_FOR_KEY[key]
+    ), f"Note {starting_note} not in key {key}."
+    assert chord in constants.STEPS_FOR_CHORD, f"Invalid chord: {chord}."
+
+
+# Every valid chord, precomputed. Keys are (key, starting_note, chord) tuples.
+_CHORDS = {
+    (key, starting_note, chord): tuple(starting_note + i for i in steps)
+    for key, notes in constants.NOTES_FOR_KEY.items()
+    for starting_note in notes
+    for chord, steps in constants.STEPS_FOR_CHORD.items()
+}
+# The chords are in ascending order, so rotating a note to the other end and moving it
+# by an octave keeps them ascending.
+_CHORD_FIRST_INVERSIONS = {
+    args: notes[1:] + (notes[0] + 12,) for args, notes in _CHORDS.items()
+}
+_CHORD_SECOND_INVERSIONS = {
+    args: (notes[-1] - 12,) + notes[:-1] for args, notes in _CHORDS.items()
+}
+
+
+def _lookup_chord(table, key: str, starting_note: int, chord: str) -> List[int]:
+    notes = table.get((key, starting_note, chord))
+    if notes is None:
+        # Only invalid arguments are missing from the table.
+        _check_chord_args(key, starting_note, chord)
+    return list(notes)
+
+
 def get_chord(key: str, starting_note: int, chord: str) -> List[int]:
     """
     Build a chord in a given key, starting from a specified note.
 
     TODO: maybe remove key parameter?
     """
-    assert key in constants.NOTES_FOR_KEY, f"Invalid key: {key}."
-    assert (
-        starting_note in constants.NOTES_FOR_KEY[key]
-    ), f"Note {starting_note} not in key {key}."
-    assert chord in constants.STEPS_FOR_CHORD, f"Invalid chord: {chord}."
-    return [starting_note + i for i in constants.STEPS_FOR_CHORD[chord]]
+    return _lookup_chord(_CHORDS, key, starting_note, chord)
 
 
 def get_chord_first_inversion(key: str, starting_note: int, chord: str) -> List[int]:
-    notes = get_chord(key, starting_note, chord)
-    return sorted(notes[1:] + notes[:1])
+    return _lookup_chord(_CHORD_FIRST_INVERSIONS, key, starting_note, chord)
 
 
 def get_chord_second_inversion(key: str, starting_note: int, chord: str) -> List[int]:
-    notes = get_chord(key, starting_note, chord)
-    return sorted(notes[-1:] + notes[:-1])
+    return _lookup_chord(_CHORD_SECOND_INVERSIONS, key, starting_note, chord)
+
 
+@functools.lru_cache(maxsize=None)
+def build_chord_progression(key: str) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Build a I-V-VI-IV chord progression in the given key.
 
-def build_chord_progression(key: str) -> List[List[int]]:
+    The result is cached, so it's returned as tuples to keep it from being modified.
+    """
     note1 = get_starting_note(key, "I")
     chord1 = get_chord(key=key, starting_note=note1, chord="major_triad")
 
@@ -79,16 +113,39 @@ def build_chord_progression(key: str) -> List[List[int]]:
         key=key, starting_note=note4, chord="major_triad"
     )
 
-    return [chord1, chord2, chord3, chord4]
+    return tuple(tuple(chord) for chord in [chord1, chord2, chord3, chord4])
 
 
 def get_random_key() -> str:
     return random.choice(constants.KEYS)
 
 
+_OCTAVE_OFFSETS = np.arange(-7, 8) * 12
+
+
+def _all_octaves(note):
+    notes = _OCTAVE_OFFSETS + note
+    return tuple(notes[(notes >= 21) & (notes <= 100)].tolist())
+
+
+# Precomputed all_octaves results for every MIDI pitch, plus an extra octave so that
+# pitches can be shifted up by an interval. Hot loops can index ALL_OCTAVES directly.
+# The masks have bit n set if n is in all_octaves(note).
+ALL_OCTAVES = [_all_octaves(note) for note in range(128 + 12)]
+_ALL_OCTAVES_MASK = [sum(1 << n for n in notes) for notes in ALL_OCTAVES]
+
+
 def all_octaves(note):
-    return [
-        i * 12 + note
-        for i in [-7, -6, -5, -4, -3, -2, -1, 0, 1, 2, 3, 4, 5, 6, 7]
-        if i * 12 + note >= 21 and i * 12 + note <= 100
-    ]
+    if 0 <= note < len(ALL_OCTAVES):
+        return ALL_OCTAVES[note]
+    return _all_octaves(note)
+
+
+def all_octaves_mask(note) -> int:
+    """
+    Return an integer with bit n set if n is in all_octaves(note). Membership can then
+    be tested with `(all_octaves_mask(note) >> n) & 1`.
+    """
+    if 0 <= note < len(_ALL_OCTAVES_MASK):
+        return _ALL_OCTAVES_MASK[note]
+    return sum(1 << n for n in _all_octaves(note))
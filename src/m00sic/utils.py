@@ -1,14 +1,20 @@
 import dataclasses
+import functools
 import math
-from typing import List, Union
+import sys
+from typing import List, Tuple, Union
 
+import numpy as np
 from note_seq.protobuf import music_pb2
 
 from m00sic.core import Chord
+from m00sic.core import HIGHEST_PIANO_MIDI_NUM
+from m00sic.core import LOWEST_PIANO_MIDI_NUM
 from m00sic.core import MajorKey
 from m00sic.core import Note
 from m00sic.core import NOTES_PER_OCTAVE
 from m00sic.core import Key
+from m00sic.core import _make_note
 
 
 # A token to indicate that a note should be starting after the previous note.
@@ -16,8 +22,22 @@ from m00sic.core import Key
 AFTER = 87178770498530249949750886040005943791
 PAUSE = 92888580960918501375582155840183771631
 
+# Dataclasses only support slots on Python 3.10+.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclasses.dataclass
+# Structured array layout used to represent arranged notes. Pitch and velocity are
+# int32, like the NoteSequence fields, so out-of-range values are kept, not wrapped.
+NOTE_DTYPE = np.dtype(
+    [
+        ("pitch", np.int32),
+        ("start_time", np.float64),
+        ("end_time", np.float64),
+        ("velocity", np.int32),
+    ]
+)
+
+
+@dataclasses.dataclass(frozen=True, **_SLOTS)
 class PatternSpec:
     """A specification used to define patterns.
 
@@ -44,7 +64,52 @@ class PatternSpec:
     velocity: int = 80
 
 
-@dataclasses.dataclass
+class Pattern:
+    """A pattern stored as one array per PatternSpec field.
+
+    Equivalent to a list of PatternSpecs, but lets arrange_chord work on whole arrays
+    instead of reading every spec's fields one at a time. Build it once and reuse it
+    for patterns that are arranged many times. AFTER start times are stored in the
+    `is_after` mask, with a start time of 0.0.
+    """
+
+    def __init__(self, specs: List[PatternSpec]):
+        # Build the arrays from the tuple, since specs may be a one-shot iterator.
+        self.specs = specs = tuple(specs)
+        # Patterns are used as cache keys, so hash the specs only once.
+        self._hash = hash(self.specs)
+        self.index = self._to_array([ps.index for ps in specs], np.intp)
+        self.is_after = self._to_array([ps.start_time == AFTER for ps in specs], bool)
+        self.start_time = self._to_array(
+            [0.0 if ps.start_time == AFTER else ps.start_time for ps in specs],
+            np.float64,
+        )
+        self.duration = self._to_array([ps.duration for ps in specs], np.float64)
+        self.end_margin = self._to_array([ps.end_margin for ps in specs], np.float64)
+        self.start_margin = self._to_array(
+            [ps.start_margin for ps in specs], np.float64
+        )
+        self.transpose = self._to_array([ps.transpose for ps in specs], np.intp)
+        self.velocity = self._to_array([ps.velocity for ps in specs], np.intp)
+
+    @staticmethod
+    def _to_array(values, dtype) -> np.ndarray:
+        # Read-only, so that the arrays always match self.specs.
+        array = np.array(values, dtype=dtype)
+        array.flags.writeable = False
+        return array
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Pattern) and self.specs == other.specs
+
+    def __hash__(self) -> int:
+        return self._hash
+
+
+@dataclasses.dataclass(**_SLOTS)
 class NoteSpec:
     """A specification for how a specific note should be played.
 
@@ -62,10 +127,10 @@ class NoteSpec:
 
     def __post_init__(self):
         if isinstance(self.note, str):
-            self.note = Note(self.note)
+            self.note = _make_note(self.note)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_SLOTS)
 class ChordSpec:
     """A specification for how a specific chord should be played."""
 
@@ -77,27 +142,148 @@ class ChordSpec:
     velocity: int = 80
 
 
-def arrange_chord(chord: Chord, pattern: List[PatternSpec]) -> music_pb2.NoteSequence:
+def arrange_chord(
+    chord: Chord, pattern: Union[List[PatternSpec], Pattern]
+) -> music_pb2.NoteSequence:
     """Arrange a list of notes in a given pattern."""
+    midi_nums = tuple(note.midi_num for note in chord.notes)
+    if not isinstance(pattern, Pattern):
+        pattern = tuple(pattern)
+    seq = music_pb2.NoteSequence()
+    # Copy the cached sequence so that callers are free to modify the result.
+    seq.CopyFrom(_arrange_midi_nums(midi_nums, pattern))
+    return seq
+
+
+def arrange_chord_array(
+    chord: Chord, pattern: Union[List[PatternSpec], Pattern]
+) -> Tuple[np.ndarray, float]:
+    """Like arrange_chord, but return the notes as an array with dtype NOTE_DTYPE.
+
+    Also returns the total time of the arrangement.
+    """
+    midi_nums = tuple(note.midi_num for note in chord.notes)
+    return _arrange_notes(midi_nums, pattern)
+
+
+@functools.lru_cache(maxsize=1024)
+def _arrange_midi_nums(
+    midi_nums: Tuple[int, ...], pattern: Union[Tuple[PatternSpec, ...], Pattern]
+) -> music_pb2.NoteSequence:
+    """Cached implementation of arrange_chord. Chords are passed as MIDI numbers."""
+    # Building the NoteSequence costs far more than the arithmetic, so the vectorized
+    # path doesn't pay off here even for long patterns.
+    notes, total_time = _arrange_notes_list(midi_nums, pattern)
     seq = music_pb2.NoteSequence()
+    for pitch, start_time, end_time, velocity in notes:
+        seq.notes.add(
+            pitch=pitch, start_time=start_time, end_time=end_time, velocity=velocity
+        )
+    seq.total_time = total_time
+    return seq
+
+
+# Below this many specs, a plain loop over the PatternSpecs is faster than NumPy because
+# of NumPy's per-call overhead. Measured for arrange_chord_array with all-AFTER
+# patterns: the loop wins up to ~40 specs (32 specs: 19 vs 29 us), the arrays from ~48.
+_MIN_ARRAY_PATTERN_LENGTH = 48
+
+
+def _use_array_path(pattern: Union[List[PatternSpec], Pattern]) -> bool:
+    """Whether to arrange the pattern with vectorized operations.
+
+    Only prebuilt Patterns qualify, since converting a list of PatternSpecs to arrays
+    costs more than the loop it replaces. Patterns that mix AFTER and explicit start
+    times (other than for the first note) need a sequential loop anyway.
+    """
+    return (
+        isinstance(pattern, Pattern)
+        and len(pattern) >= _MIN_ARRAY_PATTERN_LENGTH
+        and (pattern.is_after[1:].all() or not pattern.is_after.any())
+    )
+
+
+def _arrange_notes(
+    midi_nums: Tuple[int, ...], pattern: Union[List[PatternSpec], Pattern]
+) -> Tuple[np.ndarray, float]:
+    if _use_array_path(pattern):
+        return _arrange_notes_array(midi_nums, pattern)
+    notes, total_time = _arrange_notes_list(midi_nums, pattern)
+    return np.array(notes, dtype=NOTE_DTYPE), total_time
+
+
+def _arrange_notes_list(
+    midi_nums: Tuple[int, ...], pattern: Union[List[PatternSpec], Pattern]
+) -> Tuple[List[Tuple[int, float, float, int]], float]:
+    """Arrange a pattern one spec at a time.
+
+    Returns (pitch, start_time, end_time, velocity) tuples and the total time.
+    """
+    # Resolve which specs start AFTER the previous note up front, so the loop doesn't
+    # compare every start time. Patterns already store this as a mask.
+    if isinstance(pattern, Pattern):
+        specs, is_after = pattern.specs, pattern.is_after.tolist()
+    else:
+        specs = tuple(pattern)
+        is_after = [ps.start_time == AFTER for ps in specs]
+    notes = []
+    end_times = []
+    # Bind globals to locals so that the loop doesn't look them up on every iteration.
+    notes_per_octave = NOTES_PER_OCTAVE
+    lowest_midi_num = LOWEST_PIANO_MIDI_NUM
+    highest_midi_num = HIGHEST_PIANO_MIDI_NUM
     t = 0.0
-    t_max = -math.inf
-    for ps in pattern:
+    for ps, after in zip(specs, is_after):
         total_margin = ps.start_margin + ps.end_margin
         assert ps.duration > total_margin
-        note = chord.notes[ps.index] + ps.transpose * NOTES_PER_OCTAVE
-        start_time = t if ps.start_time == AFTER else ps.start_time
+        pitch = midi_nums[ps.index] + ps.transpose * notes_per_octave
+        if not lowest_midi_num <= pitch <= highest_midi_num:
+            raise ValueError(f"Transposed note is out of piano range: {pitch}.")
+        start_time = t if after else ps.start_time
         end_time = start_time + ps.duration
-        seq.notes.add(
-            pitch=note.midi_num,
-            start_time=start_time + ps.start_margin,
-            end_time=end_time - ps.end_margin,
-            velocity=ps.velocity,
+        notes.append(
+            (pitch, start_time + ps.start_margin, end_time - ps.end_margin, ps.velocity)
         )
+        end_times.append(end_time)
         t = end_time
-        t_max = max(t, t_max)
-    seq.total_time = t_max
-    return seq
+    return notes, max(end_times, default=-math.inf)
+
+
+def _arrange_notes_array(
+    midi_nums: Tuple[int, ...], pattern: Pattern
+) -> Tuple[np.ndarray, float]:
+    """Arrange a long Pattern with vectorized operations.
+
+    The pattern's start times must either all be explicit, or all be AFTER except for
+    the first one.
+    """
+    assert np.all(pattern.duration > pattern.start_margin + pattern.end_margin)
+    pitches = np.asarray(midi_nums, dtype=np.intp)[pattern.index]
+    pitches += pattern.transpose * NOTES_PER_OCTAVE
+    out_of_range = (pitches < LOWEST_PIANO_MIDI_NUM) | (pitches > HIGHEST_PIANO_MIDI_NUM)
+    if out_of_range.any():
+        raise ValueError(
+            f"Transposed note is out of piano range: {pitches[out_of_range][0]}."
+        )
+
+    if pattern.is_after[1:].all():
+        # Every note starts after the previous one, so the start times are a cumulative
+        # sum of the durations, offset by the first note's start time.
+        start_times = np.cumsum(
+            np.concatenate([pattern.start_time[:1], pattern.duration[:-1]])
+        )
+    else:
+        # Every start time is given explicitly, so nothing depends on earlier notes.
+        start_times = pattern.start_time
+    end_times = start_times + pattern.duration
+    t_max = np.max(end_times, initial=-np.inf).item()
+
+    notes = np.empty(len(pattern), dtype=NOTE_DTYPE)
+    notes["pitch"] = pitches
+    notes["start_time"] = start_times + pattern.start_margin
+    notes["end_time"] = end_times - pattern.end_margin
+    notes["velocity"] = pattern.velocity
+    return notes, t_max
 
 
 # def arrange_melody(
@@ -144,11 +330,16 @@ def arrange_melody(
     """
     assert len(degrees) == len(rhythm)
     seq = music_pb2.NoteSequence()
+    # Bind globals and bound methods to locals so that the loop doesn't look them up
+    # on every iteration.
+    pause = PAUSE
+    get_note = key.get_note
+    add_note = seq.notes.add
     t = 0.0
     for degree, duration in zip(degrees, rhythm):
-        if degree != PAUSE:
-            note = key.get_note(degree=degree, octave=octave)
-            seq.notes.add(
+        if degree != pause:
+            note = get_note(degree=degree, octave=octave)
+            add_note(
                 pitch=note.midi_num,
                 start_time=t,
                 end_time=t + duration,
@@ -160,34 +351,33 @@ def arrange_melody(
 
 
 def concat_sequences(*seqs):
-    """Concatenate note sequences horizontally."""
+    """Concatenate note sequences horizontally.
+
+    Every field of each note is copied (including instrument, program and is_drum),
+    and start and end times are shifted by the total time of the preceding sequences.
+    """
     concat_seqs = music_pb2.NoteSequence()
-    concat_seqs.total_time = sum([seq.total_time for seq in seqs])
+    concat_seqs.total_time = sum(seq.total_time for seq in seqs)
     t = 0.0
     for seq in seqs:
-        for note in seq.notes:
-            start_time = t + note.start_time
-            end_time = t + note.end_time
-            concat_seqs.notes.add(
-                pitch=note.pitch,
-                start_time=start_time,
-                end_time=end_time,
-                velocity=note.velocity,
-            )
+        num_notes = len(concat_seqs.notes)
+        concat_seqs.notes.MergeFrom(seq.notes)
+        # Only the times of the copied notes need to be shifted.
+        for note in concat_seqs.notes[num_notes:]:
+            note.start_time += t
+            note.end_time += t
         t += seq.total_time
     return concat_seqs
 
 
 def stack_sequences(*seqs):
-    """Stack note sequences on top of each other."""
+    """Stack note sequences on top of each other.
+
+    Every field of each note is copied unchanged (including instrument, program and
+    is_drum).
+    """
     stacked_seqs = music_pb2.NoteSequence()
-    stacked_seqs.total_time = max([seq.total_time for seq in seqs])
+    stacked_seqs.total_time = max(seq.total_time for seq in seqs)
     for seq in seqs:
-        for note in seq.notes:
-            stacked_seqs.notes.add(
-                pitch=note.pitch,
-                start_time=note.start_time,
-                end_time=note.end_time,
-                velocity=note.velocity,
-            )
+        stacked_seqs.notes.MergeFrom(seq.notes)
     return stacked_seqs
\ No newline at end of file